@@ -1,17 +1,22 @@
 import os
-import shutil
+import asyncio
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Optional
 from pathlib import Path
 
+import aiofiles
+import anyio
+import orjson
 from dotenv import load_dotenv
 load_dotenv()
 
 from fastapi import FastAPI, File, UploadFile, HTTPException, Form
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import JSONResponse, FileResponse, StreamingResponse
 from pydantic import BaseModel
 
-from src.rag.pipeline import RAGPipeline
+from src.rag.pipeline import RAGPipeline, document_fingerprint
 from src.validation.validator import ValidationLevel
 
 app = FastAPI(
@@ -30,13 +35,25 @@ app.add_middleware(
 
 pipeline: Optional[RAGPipeline] = None
 
+SAMPLE_DIR = Path("./sample_documents")
 UPLOAD_DIR = Path("./uploaded_documents")
 UPLOAD_DIR.mkdir(exist_ok=True)
+INDEX_DIR = Path(os.getenv("INDEX_DIR", "./.cache/index"))
+API_THREADS = int(os.getenv("API_THREADS", 32))
+INDEXING_RETRY_AFTER = "10"
+
+_indexing_task: Optional[asyncio.Task] = None
+UPLOAD_CHUNK_SIZE = 1 << 20
 
 class QueryRequest(BaseModel):
     question: str
     validate: bool = True
 
+class BatchQueryRequest(BaseModel):
+    questions: List[str]
+    validate: bool = True
+    max_concurrency: int = 8
+
 class QueryResponse(BaseModel):
     question: str
     answer: str
@@ -56,32 +73,95 @@ class HealthResponse(BaseModel):
 @app.on_event("startup")
 async def startup_event():
     """Initialize RAG pipeline on application startup"""
-    global pipeline
+    global pipeline, _indexing_task
     
     print("\n" + "="*60)
     print("Starting OperaDemo API")
     print("="*60)
     
+    # Blocking pipeline calls run in worker threads so the event loop keeps
+    # serving requests during LLM latency; bound both thread pools
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=API_THREADS)
+    )
+    anyio.to_thread.current_default_thread_limiter().total_tokens = API_THREADS
+    
     try:
         pipeline = RAGPipeline()
         
-        sample_dir = Path("./sample_documents")
+        # Index in the background so the API (and /health) is available
+        # immediately; document endpoints return 503 until it finishes
+        pipeline._indexing_in_progress = True
+        _indexing_task = asyncio.create_task(_run_indexing(_load_or_index_all))
         
-        if sample_dir.exists() and any(sample_dir.glob("*.pdf")):
-            print("\nLoading sample documents...")
-            pipeline.load_documents(str(sample_dir))
-        
-        if UPLOAD_DIR.exists() and any(UPLOAD_DIR.glob("*.pdf")):
-            print("\nLoading previously uploaded documents...")
-            pipeline.load_documents(str(UPLOAD_DIR), append=True)
-        
-        print("\nAPI Ready!")
+        print("\nAPI Ready! (indexing documents in background)")
         print("="*60 + "\n")
         
     except Exception as e:
         print(f"\nError initializing pipeline: {e}")
         print("="*60 + "\n")
 
+async def _run_indexing(index_fn):
+    """Run an indexing function in a worker thread, flagging the pipeline as busy"""
+    pipeline._indexing_in_progress = True
+    try:
+        await asyncio.to_thread(index_fn)
+    finally:
+        pipeline._indexing_in_progress = False
+
+
+def _load_or_index_all():
+    """Load the persisted index if documents are unchanged, else rebuild it"""
+    try:
+        fingerprint = document_fingerprint(str(SAMPLE_DIR), str(UPLOAD_DIR))
+        
+        if pipeline.load_index(str(INDEX_DIR), fingerprint):
+            print("\nLoaded persisted index (documents unchanged)")
+        else:
+            _index_all()
+        
+        print("\nDocument index ready")
+    
+    except Exception as e:
+        print(f"\nError indexing documents: {e}")
+
+
+def _require_pipeline():
+    """Reject requests until the pipeline exists and startup indexing is done"""
+    if not pipeline:
+        raise HTTPException(status_code=500, detail="Pipeline not initialized")
+    
+    if pipeline._indexing_in_progress:
+        raise HTTPException(
+            status_code=503,
+            detail="Documents are being indexed, please retry shortly",
+            headers={"Retry-After": INDEXING_RETRY_AFTER}
+        )
+
+
+def _index_all():
+    """Rebuild the index from sample and uploaded documents and persist it"""
+    fingerprint = document_fingerprint(str(SAMPLE_DIR), str(UPLOAD_DIR))
+    append = False
+    
+    if SAMPLE_DIR.exists() and any(SAMPLE_DIR.glob("*.pdf")):
+        print("\nLoading sample documents...")
+        pipeline.load_documents(str(SAMPLE_DIR))
+        append = True
+    
+    if UPLOAD_DIR.exists() and any(UPLOAD_DIR.glob("*.pdf")):
+        print("\nLoading previously uploaded documents...")
+        pipeline.load_documents(str(UPLOAD_DIR), append=append)
+    
+    pipeline.save_index(str(INDEX_DIR), fingerprint)
+
+
+def _index_uploads():
+    """Append uploaded documents to the index and persist it"""
+    fingerprint = document_fingerprint(str(SAMPLE_DIR), str(UPLOAD_DIR))
+    pipeline.load_documents(str(UPLOAD_DIR), append=True)
+    pipeline.save_index(str(INDEX_DIR), fingerprint)
+
 @app.get("/", response_class=FileResponse)
 async def root():
     return FileResponse("templates/api-dashboard.html")
@@ -93,34 +173,54 @@ async def upload_documents(files: List[UploadFile] = File(...)):
     """
     global pipeline
     
-    if not pipeline:
-        raise HTTPException(status_code=500, detail="Pipeline not initialized")
+    _require_pipeline()
     
     if not files:
         raise HTTPException(status_code=400, detail="No files provided")
     
+    pdf_files = [f for f in files if f.filename and f.filename.endswith('.pdf')]
+    
+    if not pdf_files:
+        raise HTTPException(status_code=400, detail="No valid PDF files uploaded")
+    
     saved_files = []
-    for file in files:
-        if not file.filename.endswith('.pdf'):
-            continue
+    duplicates = 0
+    for file in pdf_files:
+        file_path = UPLOAD_DIR / Path(file.filename).name
+        part_path = file_path.with_name(file_path.name + ".part")
+        digest = hashlib.blake2b(digest_size=16)
         
-        file_path = UPLOAD_DIR / file.filename
+        async with aiofiles.open(part_path, "wb") as buffer:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                digest.update(chunk)
+                await buffer.write(chunk)
         
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        if file_path.exists() and pipeline.is_document_indexed(str(file_path), digest.hexdigest()):
+            os.remove(part_path)
+            duplicates += 1
+            continue
         
+        os.replace(part_path, file_path)
         saved_files.append(str(file_path))
     
     if not saved_files:
-        raise HTTPException(status_code=400, detail="No valid PDF files uploaded")
+        stats = pipeline.get_pipeline_stats()
+        return {
+            "status": "success",
+            "files_processed": 0,
+            "duplicates_skipped": duplicates,
+            "total_chunks": stats["retriever"]["total_chunks"],
+            "message": "Documents already indexed"
+        }
     
     try:
-        pipeline.load_documents(str(UPLOAD_DIR), append=True)
+        await asyncio.to_thread(_index_uploads)
         stats = pipeline.get_pipeline_stats()
         
         return {
             "status": "success",
             "files_processed": len(saved_files),
+            "duplicates_skipped": duplicates,
             "total_chunks": stats["retriever"]["total_chunks"],
             "message": "Documents uploaded and indexed successfully"
         }
@@ -129,6 +229,19 @@ async def upload_documents(files: List[UploadFile] = File(...)):
         raise HTTPException(status_code=500, detail=f"Error processing documents: {str(e)}")
 
 
+def _to_query_response(response) -> QueryResponse:
+    """Convert a RAGResponse into the API response model"""
+    return QueryResponse(
+        question=response.query,
+        answer=response.answer,
+        validation_level=response.validation.level.value if response.validation else None,
+        confidence_score=response.validation.confidence_score if response.validation else None,
+        sources=response.sources,
+        warnings=response.validation.warnings if response.validation else [],
+        metadata=response.metadata
+    )
+
+
 @app.post("/query", response_model=QueryResponse)
 async def query_documents(request: QueryRequest):
     """
@@ -136,37 +249,99 @@ async def query_documents(request: QueryRequest):
     """
     global pipeline
     
-    if not pipeline:
-        raise HTTPException(status_code=500, detail="Pipeline not initialized")
+    _require_pipeline()
     
     try:
-        response = pipeline.query(
+        response = await asyncio.to_thread(
+            pipeline.query,
+            request.question,
+            True,
+            request.validate
+        )
+        
+        return _to_query_response(response)
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Query error: {str(e)}")
+
+
+@app.post("/query/stream")
+async def query_documents_stream(request: QueryRequest):
+    """
+    Query indexed documents, streaming the answer as Server-Sent Events
+    
+    Emits one `data: {"token": ...}` frame per generated fragment, then an
+    `event: validation` frame carrying the full QueryResponse.
+    """
+    global pipeline
+    
+    _require_pipeline()
+    
+    def event_stream():
+        for item in pipeline.stream_query(
             question=request.question,
             validate=request.validate
+        ):
+            if isinstance(item, str):
+                yield b"data: " + orjson.dumps({"token": item}) + b"\n\n"
+            else:
+                payload = orjson.dumps(_to_query_response(item).model_dump(mode="json"))
+                yield b"event: validation\ndata: " + payload + b"\n\n"
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.post("/batch_query", response_model=List[QueryResponse])
+async def batch_query_documents(request: BatchQueryRequest):
+    """
+    Query indexed documents with several questions concurrently
+    """
+    global pipeline
+    
+    _require_pipeline()
+    
+    if not request.questions:
+        raise HTTPException(status_code=400, detail="No questions provided")
+    
+    try:
+        # Client-supplied, so capped at the server's worker thread count
+        responses = await pipeline.abatch_query(
+            request.questions,
+            validate=request.validate,
+            max_concurrency=min(max(1, request.max_concurrency), API_THREADS)
         )
         
-        return QueryResponse(
-            question=response.query,
-            answer=response.answer,
-            validation_level=response.validation.level.value if response.validation else None,
-            confidence_score=response.validation.confidence_score if response.validation else None,
-            sources=[
-                {
-                    "text": s["text"],
-                    "source": s["source"],
-                    "page": s["page"],
-                    "combined_score": s.get("combined_score", 0.0),
-                    "bm25_score": s.get("bm25_score", 0.0),
-                    "dense_score": s.get("dense_score", 0.0)
-                }
-                for s in response.sources
-            ],
-            warnings=response.validation.warnings if response.validation else [],
-            metadata=response.metadata
-        )
+        return [_to_query_response(r) for r in responses]
     
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Query error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Batch query error: {str(e)}")
+
+
+@app.post("/reindex")
+async def reindex_documents():
+    """
+    Rebuild the index from all documents, ignoring the persisted copy
+    """
+    global pipeline
+    
+    _require_pipeline()
+    
+    try:
+        await _run_indexing(_index_all)
+        stats = pipeline.get_pipeline_stats()
+        
+        return {
+            "status": "success",
+            "total_chunks": stats["retriever"]["total_chunks"],
+            "message": "Documents re-indexed successfully"
+        }
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error re-indexing documents: {str(e)}")
 
 
 @app.get("/health", response_model=HealthResponse)
@@ -177,11 +352,19 @@ async def health_check():
     global pipeline
     
     pipeline_ready = pipeline is not None
-    documents_loaded = pipeline._documents_loaded if pipeline else False
+    indexing = pipeline_ready and pipeline._indexing_in_progress
+    documents_loaded = pipeline._documents_loaded and not indexing if pipeline else False
     llm_available = pipeline.llm_provider.health_check() if pipeline else False
     
+    if not pipeline_ready:
+        status = "initializing"
+    elif indexing:
+        status = "indexing"
+    else:
+        status = "healthy"
+    
     return HealthResponse(
-        status="healthy" if pipeline_ready else "initializing",
+        status=status,
         pipeline_ready=pipeline_ready,
         documents_loaded=documents_loaded,
         llm_available=llm_available
@@ -205,9 +388,17 @@ if __name__ == "__main__":
     import uvicorn
     
     port = int(os.getenv("API_PORT", 8000))
+    dev_mode = os.getenv("DEV", "0") == "1"
+    
+    # Each worker holds its own in-memory index (loaded from INDEX_DIR on
+    # start), and uploads only update the worker that received them, so
+    # only raise API_WORKERS for read-mostly deployments
     uvicorn.run(
         "main:app",
-        host="0.0.0.0",
+        host=os.getenv("API_HOST", "0.0.0.0"),
         port=port,
-        reload=True
+        loop="uvloop",
+        http="httptools",
+        workers=1 if dev_mode else int(os.getenv("API_WORKERS", 1)),
+        reload=dev_mode
     )
\ No newline at end of file
@@ -1,4 +1,5 @@
 import os
+from functools import lru_cache
 from typing import Optional
 from .base_provider import LLMProvider
 from .providers import HuggingFaceProvider, MockProvider
@@ -15,16 +16,26 @@ def create_llm_provider(
         "mistralai/Mistral-7B-Instruct-v0.2"
     )
     
+    return _create_cached_provider(provider_type.lower(), model_name, api_token)
+
+
+@lru_cache(maxsize=None)
+def _create_cached_provider(
+    provider_type: str,
+    model_name: str,
+    api_token: Optional[str]
+) -> LLMProvider:
+    """One provider (and HTTP client pool) per configuration per process"""
     print(f"\nInitializing LLM Provider...")
     print(f"   Provider: {provider_type}")
     print(f"   Model: {model_name}")
     
-    if provider_type.lower() == "huggingface":
+    if provider_type == "huggingface":
         return HuggingFaceProvider(
             model_name=model_name,
             api_token=api_token
         )
-    elif provider_type.lower() == "mock":
+    elif provider_type == "mock":
         return MockProvider(model_name=model_name)
     else:
         raise ValueError(f"Unknown provider type: {provider_type}")
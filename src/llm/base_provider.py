@@ -1,9 +1,29 @@
+import asyncio
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterator, Optional
 from dataclasses import dataclass
 
 
-@dataclass
+# Static instructions come first and per-request text last, so the prompt
+# prefix is identical across requests and cacheable by the model server
+_PROMPT_TMPL = """You are a financial document analysis assistant. Answer the question based ONLY on the provided context.
+
+INSTRUCTIONS:
+- Answer concisely and accurately
+- Only use information from the context below
+- If the context doesn't contain the answer, say "I cannot find this information in the provided documents"
+- Cite the bracketed source label when making claims (e.g., "According to [prospectus.pdf p.3]...")
+- For numerical data, quote exactly as written
+
+CONTEXT:
+{context}
+
+QUESTION: {prompt}
+
+ANSWER:""".format
+
+
+@dataclass(slots=True)
 class LLMResponse:
     """Standardized LLM response structure"""
     text: str
@@ -33,7 +53,7 @@ class LLMProvider(ABC):
         
         Args:
             prompt: The user's question
-            context: List of relevant document chunks
+            context: List of relevant document chunks, each labeled with its source
             max_tokens: Maximum tokens to generate
             temperature: Sampling temperature (lower = more focused)
             
@@ -42,6 +62,42 @@ class LLMProvider(ABC):
         """
         pass
     
+    async def agenerate(
+        self, 
+        prompt: str, 
+        context: List[str],
+        max_tokens: int = 500,
+        temperature: float = 0.1
+    ) -> LLMResponse:
+        """
+        Async variant of generate()
+        
+        Providers with a native async client should override this; the
+        default runs generate() in a worker thread.
+        """
+        return await asyncio.to_thread(
+            self.generate, prompt, context, max_tokens, temperature
+        )
+    
+    def stream_generate(
+        self, 
+        prompt: str, 
+        context: List[str],
+        max_tokens: int = 500,
+        temperature: float = 0.1
+    ) -> Iterator[str]:
+        """
+        Generate a response as a stream of text fragments
+        
+        Providers that support token streaming should override this; the
+        default yields the complete generate() output as a single fragment.
+        Errors are raised to the caller rather than returned as text.
+        """
+        response = self.generate(prompt, context, max_tokens, temperature)
+        if (response.metadata or {}).get("error"):
+            raise RuntimeError(response.metadata["error"])
+        yield response.text
+    
     @abstractmethod
     def health_check(self) -> bool:
         """Check if the LLM provider is available"""
@@ -51,27 +107,15 @@ class LLMProvider(ABC):
         """
         Format the prompt with context for optimal small model performance
         
-        Key insight: Small models need very structured prompts
+        Key insight: Small models need very structured prompts. Context blocks
+        arrive already labeled with their source and page, which the model cites.
         """
-        context_text = "\n\n".join([
-            f"[Source {i+1}]\n{chunk}" 
-            for i, chunk in enumerate(context)
-        ])
+        context_text = "\n\n".join(context)
         
-        formatted_prompt = f"""You are a financial document analysis assistant. Answer the question based ONLY on the provided context.
-
-CONTEXT:
-{context_text}
-
-QUESTION: {prompt}
-
-INSTRUCTIONS:
-- Answer concisely and accurately
-- Only use information from the context above
-- If the context doesn't contain the answer, say "I cannot find this information in the provided documents"
-- Cite source numbers when making claims (e.g., "According to Source 1...")
-- For numerical data, quote exactly as written
-
-ANSWER:"""
-        
-        return formatted_prompt
\ No newline at end of file
+        return _PROMPT_TMPL(context=context_text, prompt=prompt)
+    
+    def clean_answer(self, text: str) -> str:
+        """Strip an echoed prompt from generated text, keeping what follows the last ANSWER: marker"""
+        if "ANSWER:" in text:
+            text = text.split("ANSWER:")[-1]
+        return text.strip()
\ No newline at end of file
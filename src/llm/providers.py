@@ -6,8 +6,8 @@ Optimized for 7B parameter models like Mistral and Phi.
 """
 
 import os
-from typing import List
-from huggingface_hub import InferenceClient
+from typing import Iterator, List
+from huggingface_hub import AsyncInferenceClient, InferenceClient
 from .base_provider import LLMProvider, LLMResponse
 
 
@@ -21,11 +21,16 @@ class HuggingFaceProvider(LLMProvider):
     - google/flan-t5-large (780M, fast but limited)
     """
     
+    BASE_URL = "https://router.huggingface.co"
+    TIMEOUT = 60
+    
     def __init__(self, model_name: str, api_token: str = None, **kwargs):
         super().__init__(model_name, **kwargs)
         
         self.api_token = api_token or os.getenv("HUGGINGFACE_API_TOKEN")
-        self.client = InferenceClient(token=self.api_token, base_url="https://router.huggingface.co")
+        # Created once per provider so connections are kept alive and reused
+        self.client = InferenceClient(token=self.api_token, base_url=self.BASE_URL, timeout=self.TIMEOUT)
+        self.aclient = AsyncInferenceClient(token=self.api_token, base_url=self.BASE_URL, timeout=self.TIMEOUT)
         
         print(f"Initialized HuggingFace provider with model: {model_name}")
     
@@ -49,29 +54,83 @@ class HuggingFaceProvider(LLMProvider):
                 temperature=temperature,
             )
             
-            answer_text = response.choices[0].message.content
+            return self._to_llm_response(response, max_tokens, temperature)
             
-            if "ANSWER:" in answer_text:
-                answer_text = answer_text.split("ANSWER:")[-1].strip()
+        except Exception as e:
+            return self._error_response(e)
+    
+    async def agenerate(
+        self, 
+        prompt: str, 
+        context: List[str],
+        max_tokens: int = 500,
+        temperature: float = 0.1
+    ) -> LLMResponse:
+        """
+        Generate response using the async HuggingFace client
+        """
+        try:
+            formatted_prompt = self.format_prompt(prompt, context)
             
-            return LLMResponse(
-                text=answer_text,
+            response = await self.aclient.chat_completion(
+                messages=[{"role": "user", "content": formatted_prompt}],
                 model=self.model_name,
-                tokens_used=None,
-                metadata={
-                    "provider": "huggingface",
-                    "temperature": temperature,
-                    "max_tokens": max_tokens
-                }
+                max_tokens=max_tokens,
+                temperature=temperature,
             )
             
+            return self._to_llm_response(response, max_tokens, temperature)
+            
         except Exception as e:
-            print(f"Error calling HuggingFace API: {e}")
-            return LLMResponse(
-                text=f"Error generating response: {str(e)}",
-                model=self.model_name,
-                metadata={"error": str(e)}
-            )
+            return self._error_response(e)
+    
+    def stream_generate(
+        self, 
+        prompt: str, 
+        context: List[str],
+        max_tokens: int = 500,
+        temperature: float = 0.1
+    ) -> Iterator[str]:
+        """
+        Stream response tokens from the HuggingFace Inference API
+        """
+        formatted_prompt = self.format_prompt(prompt, context)
+        
+        stream = self.client.chat_completion(
+            messages=[{"role": "user", "content": formatted_prompt}],
+            model=self.model_name,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            stream=True,
+        )
+        
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            token = chunk.choices[0].delta.content
+            if token:
+                yield token
+    
+    def _to_llm_response(self, response, max_tokens: int, temperature: float) -> LLMResponse:
+        """Convert a chat completion into an LLMResponse"""
+        return LLMResponse(
+            text=self.clean_answer(response.choices[0].message.content),
+            model=self.model_name,
+            tokens_used=None,
+            metadata={
+                "provider": "huggingface",
+                "temperature": temperature,
+                "max_tokens": max_tokens
+            }
+        )
+    
+    def _error_response(self, e: Exception) -> LLMResponse:
+        print(f"Error calling HuggingFace API: {e}")
+        return LLMResponse(
+            text=f"Error generating response: {str(e)}",
+            model=self.model_name,
+            metadata={"error": str(e)}
+        )
     
     def health_check(self) -> bool:
         try:
@@ -1,5 +1,5 @@
-from .pipeline import RAGPipeline
+from .pipeline import RAGPipeline, document_fingerprint
 from .document_processor import DocumentProcessor
 from .retriever import HybridRetriever
 
-__all__ = ["RAGPipeline", "DocumentProcessor", "HybridRetriever"]
+__all__ = ["RAGPipeline", "DocumentProcessor", "HybridRetriever", "document_fingerprint"]
@@ -1,17 +1,64 @@
+import multiprocessing
 import os
+import re
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
 from typing import List, Dict, Any
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 import pdfplumber
+import Stemmer
 from pathlib import Path
 
 
-@dataclass
+_BREAK_RE = re.compile(r"\. |\n")
+_WS_RE = re.compile(r"\s+")
+# Matched on lowercased text; numbers are kept, a trailing "'s" is left to the stemmer
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:'[a-z]+)*")
+# Lucene's short English stopword list, so content words like "fee" always survive
+_STOPWORDS = frozenset(
+    "a an and are as at be but by for if in into is it no not of on or "
+    "such that the their then there these they this to was will with".split()
+)
+_STEMMER = Stemmer.Stemmer("english")
+# Non-whitespace control characters that pdfplumber can leave in extracted text
+_STRIP_TBL = str.maketrans("", "", "\x00\x01\x02\x03\x04\x05\x06\x07\x08\x0e\x0f")
+# Worker pools are started from inside the threaded API server, where a forked
+# child can inherit locks held by other threads; forkserver (or spawn where it
+# is unavailable) starts workers from a clean process instead
+POOL_CONTEXT = multiprocessing.get_context(
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into BM25 terms: lowercased, stopwords removed, Snowball-stemmed
+    
+    Used for both chunks and queries, so "Fees" matches "fee" and "redemptions"
+    matches "redemption". Punctuation is dropped.
+    """
+    words = [w for w in _TOKEN_RE.findall(text.lower()) if w not in _STOPWORDS]
+    return _STEMMER.stemWords(words)
+
+
+@dataclass(slots=True)
 class DocumentChunk:
     text: str
     source: str
     page: int
     chunk_id: int
-    metadata: Dict[str, Any]
+    char_start: int
+    char_end: int
+    chunk_length: int
+    tokens: List[str] = field(default_factory=list)
+    
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        return {
+            "char_start": self.char_start,
+            "char_end": self.char_end,
+            "chunk_length": self.chunk_length
+        }
     
     def __repr__(self):
         return f"Chunk(source={self.source}, page={self.page}, chars={len(self.text)})"
@@ -79,10 +126,7 @@ class DocumentProcessor:
     
     def _clean_text(self, text: str) -> str:
         """Clean and normalize extracted text"""
-        text = " ".join(text.split())
-        text = text.replace("\x00", "")
-        
-        return text.strip()
+        return _WS_RE.sub(" ", text.translate(_STRIP_TBL)).strip()
     
     def _create_chunks(
         self, 
@@ -99,29 +143,34 @@ class DocumentProcessor:
         start = 0
         chunk_id = 0
         
+        # Sentence/line breaks found in one pass; a break is usable for a
+        # chunk when the whole match fits before the chunk's end
+        break_starts = []
+        break_ends = []
+        for match in _BREAK_RE.finditer(text):
+            break_starts.append(match.start())
+            break_ends.append(match.end())
+        
         while start < len(text):
             end = start + self.chunk_size
-            chunk_text = text[start:end]
             
             if end < len(text):
-                last_period = chunk_text.rfind('. ')
-                last_newline = chunk_text.rfind('\n')
-                
-                break_point = max(last_period, last_newline)
-                if break_point > self.chunk_size - 200:
-                    chunk_text = chunk_text[:break_point + 1]
-                    end = start + len(chunk_text)
+                idx = bisect_right(break_ends, end) - 1
+                if idx >= 0 and break_starts[idx] - start > self.chunk_size - 200:
+                    end = break_starts[idx] + 1
+            
+            raw_text = text[start:end]
+            chunk_text = raw_text.strip()
             
             chunk = DocumentChunk(
-                text=chunk_text.strip(),
+                text=chunk_text,
                 source=source,
                 page=page,
                 chunk_id=chunk_id,
-                metadata={
-                    "char_start": start,
-                    "char_end": end,
-                    "chunk_length": len(chunk_text)
-                }
+                char_start=start,
+                char_end=end,
+                chunk_length=len(raw_text),
+                tokens=tokenize(chunk_text)
             )
             
             chunks.append(chunk)
@@ -144,15 +193,36 @@ class DocumentProcessor:
         Returns:
             Combined list of chunks from all documents
         """
-        all_chunks = []
         pdf_files = list(Path(directory).glob("*.pdf"))
         
         print(f"\nProcessing directory: {directory}")
         print(f"   Found {len(pdf_files)} PDF files")
         
-        for pdf_path in pdf_files:
-            chunks = self.process_pdf(str(pdf_path))
-            all_chunks.extend(chunks)
+        return self.process_files([str(p) for p in pdf_files])
+    
+    def process_files(self, pdf_paths: List[str]) -> List[DocumentChunk]:
+        """
+        Process a list of PDFs
+        
+        Multiple PDFs are parsed in parallel worker processes, since text
+        extraction is CPU-bound pure Python.
+        
+        Args:
+            pdf_paths: Paths to PDF files
+            
+        Returns:
+            Combined list of chunks from all documents
+        """
+        all_chunks = []
+        
+        if len(pdf_paths) <= 1:
+            for pdf_path in pdf_paths:
+                all_chunks.extend(self.process_pdf(pdf_path))
+        else:
+            max_workers = min(len(pdf_paths), os.cpu_count() or 1)
+            with ProcessPoolExecutor(max_workers=max_workers, mp_context=POOL_CONTEXT) as executor:
+                for chunks in executor.map(self.process_pdf, pdf_paths):
+                    all_chunks.extend(chunks)
         
         print(f"\nTotal chunks created: {len(all_chunks)}")
         
@@ -0,0 +1,235 @@
+"""
+Embedding backends for the hybrid retriever
+
+- onnx: O3-optimized, INT8 dynamically-quantized ONNX Runtime model (default, fastest on CPU)
+- torch: SentenceTransformer (FP32 on CPU, BF16 on CUDA; reference backend for A/B validation)
+
+Both expose the subset of the SentenceTransformer API the pipeline uses:
+encode() and get_sentence_embedding_dimension(). QueryBatcher coalesces
+concurrent single-query encodes on top of either backend.
+"""
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+from typing import List, Optional
+import numpy as np
+
+
+class OnnxEmbedder:
+    """
+    Sentence embedder served by ONNX Runtime with INT8 weights
+    
+    The model is exported, graph-optimized and quantized once with optimum
+    and cached on disk; later starts only load the quantized graph and need
+    just onnxruntime. optimum is optional (its transformers pin conflicts
+    with the app's), so the export can be run in a separate environment
+    that shares EMBED_CACHE_DIR. Pooling and normalization are done in
+    NumPy, so encoding does not touch PyTorch.
+    """
+    
+    OPTIMIZED_FILE = "model_optimized.onnx"
+    QUANTIZED_FILE = "model_optimized_quantized.onnx"
+    
+    def __init__(
+        self,
+        model_name: str,
+        cache_dir: Optional[str] = None,
+        max_seq_length: int = 256
+    ):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+        
+        cache_dir = cache_dir or os.getenv("EMBED_CACHE_DIR", "./.cache/onnx")
+        model_dir = Path(cache_dir) / model_name.replace("/", "__")
+        
+        if not (model_dir / self.QUANTIZED_FILE).exists():
+            self._export_quantized(model_name, model_dir)
+        
+        self.model_name = model_name
+        self.max_seq_length = max_seq_length
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.session = ort.InferenceSession(
+            str(model_dir / self.QUANTIZED_FILE),
+            providers=["CPUExecutionProvider"]
+        )
+        self._input_names = {i.name for i in self.session.get_inputs()}
+        self._dimension = self.session.get_outputs()[0].shape[-1]
+    
+    @staticmethod
+    def _export_quantized(model_name: str, model_dir: Path):
+        """Export the model to ONNX, apply O3 graph fusions, then dynamic INT8 quantization"""
+        from optimum.onnxruntime import ORTModelForFeatureExtraction, ORTOptimizer, ORTQuantizer
+        from optimum.onnxruntime.configuration import AutoOptimizationConfig, AutoQuantizationConfig
+        from transformers import AutoTokenizer
+        
+        print(f"   Exporting {model_name} to ONNX (O3, INT8)...")
+        
+        model = ORTModelForFeatureExtraction.from_pretrained(model_name, export=True)
+        model.save_pretrained(model_dir)
+        AutoTokenizer.from_pretrained(model_name).save_pretrained(model_dir)
+        
+        # Attention/LayerNorm/GELU fusions (O3 stays FP32, so it is CPU-safe)
+        optimizer = ORTOptimizer.from_pretrained(model)
+        optimizer.optimize(save_dir=model_dir, optimization_config=AutoOptimizationConfig.O3())
+        
+        quantizer = ORTQuantizer.from_pretrained(model_dir, file_name=OnnxEmbedder.OPTIMIZED_FILE)
+        quantizer.quantize(
+            save_dir=model_dir,
+            quantization_config=AutoQuantizationConfig.avx512_vnni(
+                is_static=False,
+                per_channel=False
+            )
+        )
+    
+    def get_sentence_embedding_dimension(self) -> int:
+        return self._dimension
+    
+    def encode(
+        self,
+        sentences: List[str],
+        batch_size: int = 32,
+        normalize_embeddings: bool = False,
+        convert_to_numpy: bool = True,
+        show_progress_bar: bool = False
+    ) -> np.ndarray:
+        """
+        Encode sentences into mean-pooled embeddings
+        
+        Sentences are batched in length order (like SentenceTransformer) so
+        each batch pads to similar lengths. Returns a float32 array of shape
+        [len(sentences), dimension] in input order.
+        """
+        embeddings = np.empty((len(sentences), self._dimension), dtype=np.float32)
+        order = np.argsort([len(s) for s in sentences], kind="stable")
+        
+        for start in range(0, len(sentences), batch_size):
+            rows = order[start:start + batch_size]
+            batch = [sentences[i] for i in rows]
+            inputs = self.tokenizer(
+                batch,
+                padding=True,
+                truncation=True,
+                max_length=self.max_seq_length,
+                return_tensors="np"
+            )
+            feed = {k: v.astype(np.int64) for k, v in inputs.items() if k in self._input_names}
+            
+            token_embeddings = self.session.run(None, feed)[0]
+            
+            mask = inputs["attention_mask"][..., None].astype(np.float32)
+            summed = (token_embeddings * mask).sum(axis=1)
+            counts = np.clip(mask.sum(axis=1), 1e-9, None)
+            embeddings[rows] = summed / counts
+        
+        if normalize_embeddings:
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            embeddings /= np.clip(norms, 1e-12, None)
+        
+        return embeddings
+
+
+def create_embedder(model_name: str, backend: Optional[str] = None):
+    """
+    Create the embedding model for the configured backend
+    
+    Falls back to the SentenceTransformer when onnxruntime is not installed,
+    or when no exported model is cached and optimum is not installed (see
+    the INT8 export in the README). The SentenceTransformer runs in BF16
+    when placed on CUDA (EMBED_DEVICE, default: cuda if available).
+    """
+    backend = (backend or os.getenv("EMBED_BACKEND", "onnx")).lower()
+    
+    if backend == "onnx":
+        try:
+            return OnnxEmbedder(model_name)
+        except ImportError as e:
+            print(f"   ONNX backend unavailable ({e}), using SentenceTransformer")
+    elif backend != "torch":
+        raise ValueError(f"Unknown embedding backend: {backend}")
+    
+    import torch
+    from sentence_transformers import SentenceTransformer
+    
+    device = os.getenv("EMBED_DEVICE") or ("cuda" if torch.cuda.is_available() else "cpu")
+    model_kwargs = {"dtype": torch.bfloat16} if device.startswith("cuda") else None
+    return SentenceTransformer(model_name, device=device, model_kwargs=model_kwargs)
+
+
+class QueryBatcher:
+    """
+    Micro-batches concurrent query encodes into single encode calls
+    
+    Callers block on (or await, via asyncio.wrap_future) a future per query.
+    A background thread collects queries for up to max_wait_ms or max_batch
+    queries, encodes them in one forward pass and resolves the futures, so
+    concurrent requests stop paying per-call overhead one by one.
+    """
+    
+    def __init__(self, embedder, max_batch: int = 32, max_wait_ms: float = 5.0):
+        self.embedder = embedder
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._worker: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+    
+    def submit(self, text: str) -> Future:
+        """Queue a query; the future resolves to its unit-normalized float32 embedding"""
+        future = Future()
+        self._queue.put((text, future))
+        
+        if self._worker is None:
+            with self._start_lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(
+                        target=self._run, name="query-batcher", daemon=True
+                    )
+                    self._worker.start()
+        
+        return future
+    
+    def encode(self, text: str) -> np.ndarray:
+        """Embed one query, blocking until its batch has been encoded"""
+        return self.submit(text).result()
+    
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            
+            try:
+                embeddings = self.embedder.encode(
+                    [text for text, _ in batch],
+                    batch_size=len(batch),
+                    normalize_embeddings=True,
+                    convert_to_numpy=True
+                )
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            
+            for (_, future), embedding in zip(batch, embeddings):
+                future.set_result(np.asarray(embedding, dtype=np.float32))
+
+
+if __name__ == "__main__":
+    # One-time INT8 export into EMBED_CACHE_DIR, run where optimum is installed:
+    #   python src/rag/embeddings.py [model_name]
+    import sys
+    
+    OnnxEmbedder(sys.argv[1] if len(sys.argv) > 1 else "sentence-transformers/all-MiniLM-L6-v2")
+    print("   INT8 ONNX model ready")
@@ -1,12 +1,22 @@
-from typing import List, Dict, Any, Optional
-from dataclasses import dataclass
+import asyncio
+import copy
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import List, Dict, Any, Iterator, Optional, Union
+from dataclasses import dataclass, replace
+import numpy as np
+from cachetools import TTLCache
 from .document_processor import DocumentProcessor
 from .retriever import HybridRetriever
 from ..llm import create_llm_provider, LLMProvider
+from ..llm.base_provider import LLMResponse
 from ..validation.validator import MultiStageValidator, ValidationResult
 
 
-@dataclass
+@dataclass(slots=True)
 class RAGResponse:
     """Complete RAG response with all metadata"""
     query: str
@@ -16,6 +26,52 @@ class RAGResponse:
     metadata: Dict[str, Any]
 
 
+def document_fingerprint(*directories: str) -> str:
+    """
+    Fingerprint the PDFs in the given directories
+    
+    Hashes (name, size, mtime) of every PDF, so any added, removed or
+    modified file changes the result without reading file contents.
+    """
+    entries = []
+    for directory in directories:
+        path = Path(directory)
+        if not path.is_dir():
+            continue
+        for pdf_path in path.glob("*.pdf"):
+            stat = pdf_path.stat()
+            entries.append((str(pdf_path), stat.st_size, stat.st_mtime_ns))
+    
+    digest = hashlib.blake2b(digest_size=16)
+    for name, size, mtime_ns in sorted(entries):
+        digest.update(f"{name}\0{size}\0{mtime_ns}\n".encode())
+    
+    return digest.hexdigest()
+
+
+def file_digest(path: str) -> str:
+    """blake2b digest of a file's contents"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+@dataclass
+class _PreparedQuery:
+    """Intermediate query state between retrieval and generation"""
+    question: str
+    return_sources: bool
+    validate: bool
+    cache_key: tuple
+    cache_flag: int
+    index_generation: int
+    question_embedding: np.ndarray
+    retrieved_chunks: List[Dict[str, Any]]
+    context_texts: List[str]
+
+
 class RAGPipeline:
     """
     Complete RAG Pipeline integrating:
@@ -30,7 +86,12 @@ class RAGPipeline:
         llm_provider: Optional[LLMProvider] = None,
         chunk_size: int = 800,
         chunk_overlap: int = 200,
-        top_k: int = 5
+        top_k: int = 5,
+        max_context_tokens: int = 1500,
+        cache_size: int = 1024,
+        cache_ttl: int = 3600,
+        semantic_cache_size: int = 4096,
+        semantic_threshold: float = 0.95
     ):
         """
         Initialize RAG pipeline
@@ -40,6 +101,11 @@ class RAGPipeline:
             chunk_size: Document chunk size
             chunk_overlap: Overlap between chunks
             top_k: Number of chunks to retrieve
+            max_context_tokens: Approximate token budget for context sent to the LLM
+            cache_size: Maximum number of cached query responses
+            cache_ttl: Seconds a cached query response stays valid
+            semantic_cache_size: Maximum number of question embeddings kept for paraphrase matching
+            semantic_threshold: Cosine similarity at which a cached answer is reused
         """
         print("\nInitializing RAG Pipeline...")
         
@@ -55,23 +121,72 @@ class RAGPipeline:
         self.validator = MultiStageValidator()
         
         self.top_k = top_k
+        self.max_context_tokens = max_context_tokens
         self._documents_loaded = False
+        self._indexing_in_progress = False
+        self._indexed_hashes: Dict[str, str] = {}
+        self._query_cache = TTLCache(maxsize=cache_size, ttl=cache_ttl)
+        
+        # Queries may run concurrently in worker threads: _cache_lock guards
+        # both caches, _index_lock keeps retrieval off a half-updated index.
+        # _index_generation is bumped on every index change so answers
+        # computed against the previous index are never cached
+        self._cache_lock = threading.Lock()
+        self._index_lock = threading.RLock()
+        self._index_generation = 0
+        # Serializes index writes to disk, which run outside _index_lock
+        self._save_lock = threading.Lock()
+        
+        self.semantic_threshold = semantic_threshold
+        self._sem_capacity = semantic_cache_size
+        self._sem_keys: Optional[np.ndarray] = None
+        self._sem_flags = np.zeros(semantic_cache_size, dtype=np.int8)
+        self._sem_vals: List[Optional[RAGResponse]] = [None] * semantic_cache_size
+        self._sem_count = 0
+        self._sem_next = 0
         
         print(" RAG Pipeline ready\n")
     
     def load_documents(self, document_path: str, append: bool = False):
-        import os
+        """
+        Process and index a PDF file or a directory of PDFs
         
+        When appending, files whose contents are unchanged since they were
+        last indexed are skipped; changed files replace their old chunks.
+        """
         if os.path.isfile(document_path):
-            chunks = self.document_processor.process_pdf(document_path)
+            pdf_paths = [str(Path(document_path).resolve())]
         elif os.path.isdir(document_path):
-            chunks = self.document_processor.process_directory(document_path)
+            pdf_paths = sorted(str(p.resolve()) for p in Path(document_path).glob("*.pdf"))
         else:
             raise ValueError(f"Invalid path: {document_path}")
         
+        indexed_hashes = self._indexed_hashes if append else {}
+        digests = {p: file_digest(p) for p in pdf_paths}
+        pending = [p for p in pdf_paths if indexed_hashes.get(p) != digests[p]]
+        
+        if not pending:
+            print(" No new or changed documents to index")
+            return
+        
+        changed_sources = {os.path.basename(p) for p in pending if p in indexed_hashes}
+        
+        print(f"\nIndexing {len(pending)} of {len(pdf_paths)} PDF files")
+        chunks = self.document_processor.process_files(pending)
+        
         if chunks:
-            self.retriever.index_documents(chunks, append=append)
-            self._documents_loaded = True
+            embeddings = self.retriever.embed_texts([c.text for c in chunks])
+            
+            with self._index_lock:
+                self.retriever.index_documents(
+                    chunks,
+                    append=append,
+                    embeddings=embeddings,
+                    remove_sources=changed_sources
+                )
+                self._indexed_hashes = {**indexed_hashes, **{p: digests[p] for p in pending}}
+                self._documents_loaded = True
+                self._clear_caches()
             
             stats = self.retriever.get_stats()
         
@@ -82,6 +197,62 @@ class RAGPipeline:
         else:
             print(" No chunks created from documents")
     
+    def is_document_indexed(self, path: str, digest: str) -> bool:
+        """Check whether a file with this content is already indexed at path"""
+        return self._indexed_hashes.get(str(Path(path).resolve())) == digest
+    
+    def save_index(self, index_dir: str, fingerprint: str):
+        """Persist the retriever index for fast restarts"""
+        if not self._documents_loaded:
+            return
+        
+        # Queries keep retrieving during the disk write: the index is only
+        # locked to snapshot it and to swap in the memory-mapped matrices
+        with self._save_lock:
+            with self._index_lock:
+                snapshot = self.retriever.index_snapshot()
+                indexed_hashes = dict(self._indexed_hashes)
+                generation = self._index_generation
+            
+            self.retriever.write_index(index_dir, self._index_fingerprint(fingerprint), snapshot)
+            with open(Path(index_dir) / "documents.json", "w") as f:
+                json.dump(indexed_hashes, f)
+            
+            with self._index_lock:
+                if self._index_generation == generation:
+                    self.retriever.map_saved_embeddings(index_dir)
+    
+    def load_index(self, index_dir: str, fingerprint: str) -> bool:
+        """
+        Load a persisted index if it was built from the same documents
+        
+        Returns True when the index was loaded and load_documents can be skipped
+        """
+        with self._index_lock:
+            if not self.retriever.load_index(index_dir, self._index_fingerprint(fingerprint)):
+                return False
+            
+            hashes_path = Path(index_dir) / "documents.json"
+            if hashes_path.exists():
+                with open(hashes_path) as f:
+                    self._indexed_hashes = json.load(f)
+            
+            self._documents_loaded = bool(self.retriever.chunks)
+            self._clear_caches()
+            return self._documents_loaded
+    
+    def _index_fingerprint(self, document_fingerprint: str) -> str:
+        """Combine the document fingerprint with settings that change the index"""
+        return ":".join([
+            document_fingerprint,
+            str(self.document_processor.chunk_size),
+            str(self.document_processor.chunk_overlap),
+            self.retriever.embedding_model_name,
+            # The resolved backend: onnx falls back to torch without an export,
+            # and INT8 and FP32 vectors must not be mixed in one index
+            type(self.retriever.embedding_model).__name__
+        ])
+    
     def query(
         self,
         question: str,
@@ -99,6 +270,105 @@ class RAGPipeline:
         Returns:
             RAGResponse with answer, sources, and validation
         """
+        prepared = self._prepare_query(question, return_sources, validate)
+        if isinstance(prepared, RAGResponse):
+            return prepared
+        
+        print(" 2. Generating answer with LLM...")
+        llm_response = self.llm_provider.generate(
+            prompt=question,
+            context=prepared.context_texts,
+            max_tokens=500,
+            temperature=0.1
+        )
+        
+        return self._complete_query(prepared, llm_response)
+    
+    async def aquery(
+        self,
+        question: str,
+        return_sources: bool = True,
+        validate: bool = True
+    ) -> RAGResponse:
+        """
+        Async variant of query() that awaits the LLM call
+        
+        Cache lookups and retrieval run in a worker thread, so concurrent
+        queries share batched question encodes instead of blocking the event
+        loop one at a time; validation stays synchronous.
+        """
+        prepared = await asyncio.to_thread(self._prepare_query, question, return_sources, validate)
+        if isinstance(prepared, RAGResponse):
+            return prepared
+        
+        print(" 2. Generating answer with LLM (async)...")
+        llm_response = await self.llm_provider.agenerate(
+            prompt=question,
+            context=prepared.context_texts,
+            max_tokens=500,
+            temperature=0.1
+        )
+        
+        return self._complete_query(prepared, llm_response)
+    
+    def stream_query(
+        self,
+        question: str,
+        return_sources: bool = True,
+        validate: bool = True
+    ) -> Iterator[Union[str, RAGResponse]]:
+        """
+        Execute a RAG query, streaming the answer as it is generated
+        
+        Yields answer text fragments, then the complete RAGResponse
+        (validated after generation finishes) as the final item.
+        """
+        prepared = self._prepare_query(question, return_sources, validate)
+        if isinstance(prepared, RAGResponse):
+            yield prepared.answer
+            yield prepared
+            return
+        
+        print(" 2. Streaming answer from LLM...")
+        parts = []
+        metadata = {"streamed": True}
+        
+        try:
+            for token in self.llm_provider.stream_generate(
+                prompt=question,
+                context=prepared.context_texts,
+                max_tokens=500,
+                temperature=0.1
+            ):
+                parts.append(token)
+                yield token
+        except Exception as e:
+            print(f"Error streaming LLM response: {e}")
+            error_text = f"Error generating response: {str(e)}"
+            parts.append(error_text)
+            metadata["error"] = str(e)
+            yield error_text
+        
+        # Post-processed like a non-streamed answer, since both share the caches
+        llm_response = LLMResponse(
+            text=self.llm_provider.clean_answer("".join(parts)),
+            model=self.llm_provider.model_name,
+            metadata=metadata
+        )
+        
+        yield self._complete_query(prepared, llm_response)
+    
+    def _prepare_query(
+        self,
+        question: str,
+        return_sources: bool,
+        validate: bool
+    ) -> Union[RAGResponse, _PreparedQuery]:
+        """
+        Run everything before generation: cache lookups and retrieval
+        
+        Returns a finished RAGResponse when no LLM call is needed
+        """
         if not self._documents_loaded:
             return RAGResponse(
                 query=question,
@@ -108,14 +378,36 @@ class RAGPipeline:
                 metadata={"error": "no_documents_loaded"}
             )
         
+        cache_key = self._cache_key(question, return_sources, validate)
+        with self._cache_lock:
+            cached = self._query_cache.get(cache_key)
+            index_generation = self._index_generation
+        if cached is not None:
+            print(f"\n Query (cached): {question}")
+            return replace(cached, query=question)
+        
+        cache_flag = (int(return_sources) << 1) | int(validate)
+        question_embedding = self.retriever.query_encoder.encode(question)
+        
+        similar = self._semantic_lookup(question_embedding, cache_flag)
+        if similar is not None:
+            print(f"\n Query (semantic cache): {question}")
+            response = replace(similar, query=question)
+            with self._cache_lock:
+                if index_generation == self._index_generation:
+                    self._query_cache[cache_key] = response
+            return copy.copy(response)
+        
         print(f"\n Query: {question}")
         
         print(" 1. Retrieving relevant context...")
-        retrieved_chunks = self.retriever.retrieve(
-            query=question,
-            top_k=self.top_k,
-            return_scores=True
-        )
+        with self._index_lock:
+            retrieved_chunks = self.retriever.retrieve(
+                query=question,
+                top_k=self.top_k,
+                return_scores=True,
+                query_embedding=question_embedding
+            )
         
         if not retrieved_chunks:
             return RAGResponse(
@@ -129,21 +421,32 @@ class RAGPipeline:
         print(f"      -> Retrieved {len(retrieved_chunks)} chunks")
         print(f"      -> Top score: {retrieved_chunks[0]['combined_score']:.3f}")
         
-        print(" 2. Generating answer with LLM...")
-        context_texts = [chunk["text"] for chunk in retrieved_chunks]
-        
-        llm_response = self.llm_provider.generate(
-            prompt=question,
-            context=context_texts,
-            max_tokens=500,
-            temperature=0.1
+        return _PreparedQuery(
+            question=question,
+            return_sources=return_sources,
+            validate=validate,
+            cache_key=cache_key,
+            cache_flag=cache_flag,
+            index_generation=index_generation,
+            question_embedding=question_embedding,
+            retrieved_chunks=retrieved_chunks,
+            context_texts=self._pack_context(retrieved_chunks)
         )
+    
+    def _complete_query(
+        self,
+        prepared: _PreparedQuery,
+        llm_response: LLMResponse
+    ) -> RAGResponse:
+        """Validate the generated answer, build the response and cache it"""
+        question = prepared.question
+        retrieved_chunks = prepared.retrieved_chunks
         
         print(f"      -> Generated {len(llm_response.text.split())} word response")
         
         validation_result = None
         
-        if validate:
+        if prepared.validate:
             print("   3. Running validation framework...")
             validation_result = self.validator.validate(
                 query=question,
@@ -156,7 +459,7 @@ class RAGPipeline:
             if validation_result.warnings:
                 print(f"      -> Warnings: {len(validation_result.warnings)}")
         
-        sources = retrieved_chunks if return_sources else []
+        sources = retrieved_chunks if prepared.return_sources else []
         
         response = RAGResponse(
             query=question,
@@ -165,16 +468,94 @@ class RAGPipeline:
             validation=validation_result,
             metadata={
                 "retrieval_count": len(retrieved_chunks),
+                "context_chunks": len(prepared.context_texts),
                 "model": llm_response.model,
                 "tokens_used": llm_response.tokens_used,
                 "top_retrieval_score": retrieved_chunks[0]["combined_score"]
             }
         )
         
+        if not (llm_response.metadata or {}).get("error"):
+            with self._cache_lock:
+                if prepared.index_generation == self._index_generation:
+                    self._query_cache[prepared.cache_key] = response
+                    self._semantic_store(prepared.question_embedding, prepared.cache_flag, response)
+        
         print("   Query complete\n")
         
         return response
     
+    def _pack_context(self, retrieved_chunks: List[Dict[str, Any]]) -> List[str]:
+        """
+        Select labeled chunk texts for the prompt within max_context_tokens
+        
+        Chunks are selected best first, with tokens estimated at ~4 characters
+        each. The top chunk is always included; lower-ranked chunks that would
+        exceed the budget are dropped from the prompt but still returned as
+        sources. The selection is then put in document order so queries that
+        retrieve the same chunks produce the same prompt prefix, which lets a
+        model server reuse its prefix/KV cache. Each block is labeled with its
+        source and page rather than its position, so citations stay meaningful
+        whatever the order.
+        """
+        selected = []
+        used_tokens = 0
+        
+        for chunk in retrieved_chunks:
+            chunk_tokens = len(chunk["text"]) // 4
+            if selected and used_tokens + chunk_tokens > self.max_context_tokens:
+                break
+            selected.append(chunk)
+            used_tokens += chunk_tokens
+        
+        selected.sort(key=lambda c: (c["source"], c["page"], c["chunk_id"]))
+        
+        return [f"[{chunk['source']} p.{chunk['page']}]\n{chunk['text']}" for chunk in selected]
+    
+    def _cache_key(self, question: str, return_sources: bool, validate: bool) -> tuple:
+        """Build the exact-match cache key for a normalized question"""
+        digest = hashlib.blake2b(
+            question.strip().lower().encode(),
+            digest_size=16
+        ).digest()
+        return (digest, self.top_k, return_sources, validate)
+    
+    def _semantic_lookup(self, embedding: np.ndarray, flag: int) -> Optional[RAGResponse]:
+        """Return the cached response of the most similar previous question, if close enough"""
+        with self._cache_lock:
+            if not self._sem_count:
+                return None
+            
+            sims = self._sem_keys[:self._sem_count] @ embedding
+            sims[self._sem_flags[:self._sem_count] != flag] = -1.0
+            
+            best = int(np.argmax(sims))
+            if sims[best] >= self.semantic_threshold:
+                return self._sem_vals[best]
+            return None
+    
+    def _semantic_store(self, embedding: np.ndarray, flag: int, response: RAGResponse):
+        """Insert a question embedding, evicting the oldest entry once full (caller holds _cache_lock)"""
+        if self._sem_keys is None:
+            self._sem_keys = np.empty((self._sem_capacity, embedding.shape[0]), dtype=np.float32)
+        
+        slot = self._sem_next
+        self._sem_keys[slot] = embedding
+        self._sem_flags[slot] = flag
+        self._sem_vals[slot] = response
+        
+        self._sem_next = (slot + 1) % self._sem_capacity
+        self._sem_count = min(self._sem_count + 1, self._sem_capacity)
+    
+    def _clear_caches(self):
+        """Drop cached answers after the index changes"""
+        with self._cache_lock:
+            self._index_generation += 1
+            self._query_cache.clear()
+            self._sem_vals = [None] * self._sem_capacity
+            self._sem_count = 0
+            self._sem_next = 0
+    
     def batch_query(
         self,
         questions: List[str],
@@ -196,6 +577,28 @@ class RAGPipeline:
         
         return responses
     
+    async def abatch_query(
+        self,
+        questions: List[str],
+        validate: bool = True,
+        max_concurrency: int = 8
+    ) -> List[RAGResponse]:
+        """
+        Process multiple queries with concurrent LLM calls
+        
+        At most max_concurrency generations are in flight at once;
+        responses are returned in the same order as questions.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        print(f"\nProcessing {len(questions)} queries (concurrency {max_concurrency})...")
+        
+        async def _bounded(question: str) -> RAGResponse:
+            async with semaphore:
+                return await self.aquery(question, validate=validate)
+        
+        return list(await asyncio.gather(*[_bounded(q) for q in questions]))
+    
     def get_pipeline_stats(self) -> Dict[str, Any]:
         """Get statistics about the pipeline"""
         retriever_stats = self.retriever.get_stats()
@@ -7,12 +7,107 @@ Why hybrid?
 - Combined: Best of both worlds for financial documents
 """
 
-from typing import List, Dict, Any
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
 import numpy as np
-from sentence_transformers import SentenceTransformer
-from rank_bm25 import BM25Okapi
-from sklearn.metrics.pairwise import cosine_similarity
-from .document_processor import DocumentChunk
+import bm25s
+from .document_processor import POOL_CONTEXT, DocumentChunk, tokenize
+from .embeddings import QueryBatcher, create_embedder
+
+try:
+    import simsimd
+except ImportError:
+    simsimd = None
+
+try:
+    import faiss
+except ImportError:
+    faiss = None
+
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+
+
+# Bump when the persisted index layout or DocumentChunk fields change
+INDEX_FORMAT_VERSION = 7
+
+# HNSW graph parameters for the optional FAISS candidate index
+ANN_HNSW_NEIGHBORS = 32
+ANN_EF_CONSTRUCTION = 200
+ANN_ADD_BATCH = 65536
+
+# Score vectors at least this long are combined by the numba kernel (when installed)
+NUMBA_MIN_SCORES = 100_000
+
+# Below this many untokenized chunks, process start-up costs more than it saves
+PARALLEL_TOKENIZE_MIN_CHUNKS = 2000
+
+
+if njit is not None:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _weighted_sum(bm25, dense, bm25_factor, dense_factor, out):
+        """out = bm25 * bm25_factor + dense * dense_factor in one parallel pass"""
+        for i in prange(out.size):
+            out[i] = bm25[i] * bm25_factor + dense[i] * dense_factor
+else:
+    _weighted_sum = None
+
+
+def _normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalize rows into a C-contiguous float32 array"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return np.ascontiguousarray(vectors / np.maximum(norms, 1e-12))
+
+
+def _quantize_rows(vectors: np.ndarray) -> np.ndarray:
+    """
+    Quantize rows to int8 with a per-row scale (max |x| maps to 127)
+    
+    Cosine similarity is scale-invariant, so the scales are not needed
+    for scoring and are not kept.
+    """
+    vectors = np.atleast_2d(vectors)
+    scales = 127.0 / np.maximum(np.abs(vectors).max(axis=1, keepdims=True), 1e-12)
+    return np.ascontiguousarray(np.round(vectors * scales).astype(np.int8))
+
+
+def _top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores, best first (O(N) selection + O(k log k) sort)"""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    
+    top = np.argpartition(scores, -k)[-k:]
+    return top[np.argsort(-scores[top], kind="stable")]
+
+
+def _tokenize_chunks(chunks: List[DocumentChunk]) -> List[List[str]]:
+    """
+    Token lists for BM25, tokenizing only chunks that arrive without tokens
+    
+    Large batches are sharded across worker processes. Tokens are stored on
+    the chunks so later index rebuilds (appends) reuse them.
+    """
+    missing = [c for c in chunks if not c.tokens]
+    workers = os.cpu_count() or 1
+    
+    if len(missing) >= PARALLEL_TOKENIZE_MIN_CHUNKS and workers > 1:
+        chunksize = max(1, len(missing) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers, mp_context=POOL_CONTEXT) as executor:
+            token_lists = executor.map(tokenize, [c.text for c in missing], chunksize=chunksize)
+            for chunk, tokens in zip(missing, token_lists):
+                chunk.tokens = tokens
+    else:
+        for chunk in missing:
+            chunk.tokens = tokenize(chunk.text)
+    
+    return [c.tokens for c in chunks]
 
 
 class HybridRetriever:
@@ -27,7 +122,11 @@ class HybridRetriever:
         self,
         embedding_model: str = "sentence-transformers/all-MiniLM-L6-v2",
         bm25_weight: float = 0.5,
-        dense_weight: float = 0.5
+        dense_weight: float = 0.5,
+        embedding_backend: Optional[str] = None,
+        bm25_candidates: int = 200,
+        dense_candidates: int = 0,
+        ann_min_chunks: int = 50000
     ):
         """
         Initialize hybrid retriever
@@ -36,16 +135,42 @@ class HybridRetriever:
             embedding_model: SentenceTransformer model for dense embeddings
             bm25_weight: Weight for BM25 scores (0-1)
             dense_weight: Weight for dense scores (0-1)
+            embedding_backend: "onnx" (INT8) or "torch" (FP32/BF16); defaults to EMBED_BACKEND
+            bm25_candidates: Dense-score only the top BM25 candidates (0 scores every chunk)
+            dense_candidates: Also add the top dense matches to the candidates, to keep
+                semantic-only hits (costs a full dense pass; 0 disables)
+            ann_min_chunks: From this corpus size, dense top-N candidates come from a
+                FAISS HNSW index instead of a full pass (needs faiss; 0 disables)
         """
         print(f"\nInitializing Hybrid Retriever...")
         print(f"   Embedding model: {embedding_model}")
         
-        self.embedding_model = SentenceTransformer(embedding_model)
+        self.embedding_model_name = embedding_model
+        self.embedding_model = create_embedder(embedding_model, embedding_backend)
+        # Concurrent queries share batched encode calls
+        self.query_encoder = QueryBatcher(self.embedding_model)
+        # GPUs need large batches to be saturated during indexing
+        on_gpu = str(getattr(self.embedding_model, "device", "cpu")).startswith("cuda")
+        self.embed_batch_size = 256 if on_gpu else 64
         self.bm25_weight = bm25_weight
         self.dense_weight = dense_weight
+        self.bm25_candidates = bm25_candidates
+        self.dense_candidates = dense_candidates
+        self.ann_min_chunks = ann_min_chunks
         self.chunks: List[DocumentChunk] = []
+        # Unit-normalized rows stored as float16 (kept for persistence and rebuilds)
         self.chunk_embeddings: np.ndarray = None
-        self.bm25: BM25Okapi = None
+        # int8 rows used for scoring; both matrices are memory-mapped once
+        # the index has been saved or loaded
+        self.chunk_embeddings_q8: np.ndarray = None
+        self._q8_norms: np.ndarray = None
+        # Score buffers reused across queries (sized to the corpus); callers
+        # serialize retrieve() with indexing, as RAGPipeline does
+        self._combined_buf: np.ndarray = np.empty(0, dtype=np.float32)
+        self._scratch_buf: np.ndarray = np.empty(0, dtype=np.float32)
+        # HNSW index over the embeddings, only for large corpora (see _ann_index)
+        self._ann = None
+        self.bm25: bm25s.BM25 = None
         
         print("   Retriever initialized")
     
@@ -53,7 +178,8 @@ class HybridRetriever:
         self, 
         query: str, 
         top_k: int = 5,
-        return_scores: bool = True
+        return_scores: bool = True,
+        query_embedding: Optional[np.ndarray] = None
     ) -> List[Dict[str, Any]]:
         """
         Hybrid retrieval combining BM25 and dense similarity
@@ -62,6 +188,7 @@ class HybridRetriever:
             query: Search query
             top_k: Number of results to return
             return_scores: Whether to include retrieval scores
+            query_embedding: Precomputed query embedding (skips re-encoding)
             
         Returns:
             List of retrieved chunks with metadata
@@ -70,60 +197,204 @@ class HybridRetriever:
             print(" No documents indexed")
             return []
         
-        tokenized_query = query.split()
-        bm25_scores = self.bm25.get_scores(tokenized_query)
+        bm25_scores = self._bm25_scores(tokenize(query))
         
-        query_embedding = self.embedding_model.encode([query])[0]
-        dense_scores = cosine_similarity(
-            [query_embedding], 
-            self.chunk_embeddings
-        )[0]
+        if query_embedding is None:
+            query_embedding = self.query_encoder.encode(query)
         
-        bm25_scores_norm = self._normalize_scores(bm25_scores)
-        dense_scores_norm = self._normalize_scores(dense_scores)
+        # Two-stage retrieval: BM25 picks the candidates, dense scoring and
+        # score fusion run on that subset only
+        candidates, dense_scores = self._select_candidates(bm25_scores, query_embedding)
+        if candidates is not None:
+            bm25_scores = bm25_scores[candidates]
         
-        combined_scores = (
-            self.bm25_weight * bm25_scores_norm + 
-            self.dense_weight * dense_scores_norm
-        )
+        # Min-max normalization and weighting fused into two scaled passes;
+        # the constant term does not affect ranking, so it is only added to
+        # the returned scores
+        bm25_scale, bm25_offset = self._normalization(bm25_scores)
+        dense_scale, dense_offset = self._normalization(dense_scores)
+        n = len(bm25_scores)
         
-        top_indices = np.argsort(combined_scores)[-top_k:][::-1]
+        bm25_factor = self.bm25_weight * bm25_scale
+        dense_factor = self.dense_weight * dense_scale
         
+        if _weighted_sum is not None and n >= NUMBA_MIN_SCORES:
+            combined_scores = self._combined_buf[:n]
+            _weighted_sum(bm25_scores, dense_scores, bm25_factor, dense_factor, combined_scores)
+        else:
+            combined_scores = np.multiply(bm25_scores, bm25_factor, out=self._combined_buf[:n])
+            combined_scores += np.multiply(dense_scores, dense_factor, out=self._scratch_buf[:n])
+        combined_offset = self.bm25_weight * bm25_offset + self.dense_weight * dense_offset
+        
+        top_indices = _top_k_indices(combined_scores, top_k)
+        
+        # Results are built in the shape the API returns, so they can be
+        # passed through to the response without another copy
         results = []
         for idx in top_indices:
-            chunk = self.chunks[idx]
+            chunk = self.chunks[idx if candidates is None else candidates[idx]]
             
-            result = {
-                "chunk": chunk,
+            results.append({
                 "text": chunk.text,
                 "source": chunk.source,
                 "page": chunk.page,
-                "chunk_id": chunk.chunk_id
-            }
-            
-            if return_scores:
-                result.update({
-                    "combined_score": float(combined_scores[idx]),
-                    "bm25_score": float(bm25_scores_norm[idx]),
-                    "dense_score": float(dense_scores_norm[idx])
-                })
-            
-            results.append(result)
+                "chunk_id": chunk.chunk_id,
+                "combined_score": float(combined_scores[idx] + combined_offset) if return_scores else 0.0,
+                "bm25_score": float(bm25_scores[idx] * bm25_scale + bm25_offset) if return_scores else 0.0,
+                "dense_score": float(dense_scores[idx] * dense_scale + dense_offset) if return_scores else 0.0
+            })
         
         return results
     
-    def _normalize_scores(self, scores: np.ndarray) -> np.ndarray:
-        """Normalize scores to 0-1 range"""
+    def _select_candidates(
+        self,
+        bm25_scores: np.ndarray,
+        query_embedding: np.ndarray
+    ) -> Tuple[Optional[np.ndarray], np.ndarray]:
+        """
+        Pick the chunks to dense-score and score them
+        
+        Returns (candidate row indices, or None for all chunks, dense scores
+        aligned with them). Every chunk is scored when the corpus is no larger
+        than bm25_candidates. Dense top-N candidates (dense_candidates, or
+        bm25_candidates when the query has no BM25 match at all) come from the
+        HNSW index when one is in use, otherwise from a full dense pass.
+        """
+        n_candidates = self.bm25_candidates
+        if not n_candidates or len(self.chunks) <= n_candidates:
+            return None, self._dense_scores(query_embedding)
+        
+        has_bm25_match = bm25_scores.max() > 0
+        n_dense = self.dense_candidates if has_bm25_match else n_candidates
+        
+        if has_bm25_match:
+            candidates = np.argpartition(bm25_scores, -n_candidates)[-n_candidates:]
+        else:
+            candidates = np.empty(0, dtype=np.intp)
+        
+        if not n_dense:
+            candidates.sort()
+            return candidates, self._dense_scores(query_embedding, candidates)
+        
+        if self._ann_index() is not None:
+            candidates = np.union1d(candidates, self._ann_search(query_embedding, n_dense))
+            return candidates, self._dense_scores(query_embedding, candidates)
+        
+        all_dense = self._dense_scores(query_embedding)
+        if not has_bm25_match:
+            return None, all_dense
+        
+        candidates = np.union1d(candidates, _top_k_indices(all_dense, n_dense))
+        return candidates, all_dense[candidates]
+    
+    def _ann_index(self):
+        """
+        FAISS HNSW index over the embeddings, built on first use
+        
+        Returns None when faiss is not installed or the corpus is smaller
+        than ann_min_chunks (exact dense passes are cheap enough there).
+        """
+        if faiss is None or not self.ann_min_chunks or len(self.chunks) < self.ann_min_chunks:
+            return None
+        
+        if self._ann is None:
+            print(f"   Building HNSW index over {len(self.chunks)} embeddings...")
+            index = faiss.IndexHNSWFlat(
+                self.chunk_embeddings.shape[1], ANN_HNSW_NEIGHBORS, faiss.METRIC_INNER_PRODUCT
+            )
+            index.hnsw.efConstruction = ANN_EF_CONSTRUCTION
+            self._ann_add(index, self.chunk_embeddings)
+            self._ann = index
+        
+        return self._ann
+    
+    @staticmethod
+    def _ann_add(index, embeddings: np.ndarray):
+        """Add rows to an HNSW index in batches, so only one float32 batch exists besides the graph"""
+        for start in range(0, len(embeddings), ANN_ADD_BATCH):
+            batch = embeddings[start:start + ANN_ADD_BATCH]
+            index.add(np.ascontiguousarray(batch, dtype=np.float32))
+    
+    def _ann_search(self, query_embedding: np.ndarray, k: int) -> np.ndarray:
+        """Row indices of the approximate top-k chunks by inner product"""
+        query = _normalize_rows(np.asarray(query_embedding).reshape(1, -1))
+        params = faiss.SearchParametersHNSW(efSearch=max(2 * k, 64))
+        _, ids = self._ann.search(query, k, params=params)
+        ids = ids[0]
+        return ids[ids >= 0]
+    
+    def _bm25_scores(self, query_tokens: List[str]) -> np.ndarray:
+        """BM25 score of every chunk (a sparse lookup over precomputed token scores)"""
+        if not query_tokens:
+            return np.zeros(len(self.chunks), dtype=np.float32)
+        return self.bm25.get_scores(query_tokens)
+    
+    def _dense_scores(
+        self,
+        query_embedding: np.ndarray,
+        rows: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """
+        Cosine similarity between the query and every chunk (or only the given rows)
+        
+        Scoring runs on the int8-quantized matrix, so each query streams a
+        quarter of the bytes of the float32 embeddings: SimSIMD's int8 cosine
+        kernel when installed, otherwise an int32-accumulated dot product
+        divided by the precomputed row norms.
+        """
+        query_q8 = _quantize_rows(np.asarray(query_embedding, dtype=np.float32))[0]
+        matrix, norms = self.chunk_embeddings_q8, self._q8_norms
+        if rows is not None:
+            matrix, norms = matrix[rows], norms[rows]
+        
+        if simsimd is not None:
+            distances = simsimd.cdist(query_q8[None, :], matrix, metric="cosine")
+            return 1.0 - np.asarray(distances, dtype=np.float32)[0]
+        
+        query_i32 = query_q8.astype(np.int32)
+        dots = matrix.dot(query_i32).astype(np.float32)
+        return dots / (norms * max(np.sqrt(query_i32.dot(query_i32)), 1e-12))
+    
+    def _set_embeddings(self, embeddings: np.ndarray, embeddings_q8: Optional[np.ndarray] = None):
+        """
+        Store unit-normalized embeddings (as float16), their int8 scoring rows
+        and size the score buffers
+        
+        embeddings_q8 is quantized from embeddings when not given.
+        """
+        if embeddings_q8 is None:
+            embeddings_q8 = _quantize_rows(embeddings)
+        
+        # Everything is allocated before any attribute is replaced
+        embeddings = embeddings.astype(np.float16, copy=False)
+        q8_norms = np.maximum(np.linalg.norm(embeddings_q8.astype(np.float32), axis=1), 1e-12)
+        combined_buf = np.empty(len(embeddings), dtype=np.float32)
+        scratch_buf = np.empty(len(embeddings), dtype=np.float32)
+        
+        self.chunk_embeddings = embeddings
+        self.chunk_embeddings_q8 = embeddings_q8
+        self._ann = None
+        self._q8_norms = q8_norms
+        self._combined_buf = combined_buf
+        self._scratch_buf = scratch_buf
+    
+    @staticmethod
+    def _normalization(scores: np.ndarray) -> Tuple[float, float]:
+        """
+        (scale, offset) such that scores * scale + offset is normalized to 0-1
+        
+        Constant (or empty) scores normalize to 1.
+        """
         if len(scores) == 0:
-            return scores
+            return 0.0, 1.0
         
-        min_score = scores.min()
-        max_score = scores.max()
+        min_score = float(scores.min())
+        score_range = float(scores.max()) - min_score
         
-        if max_score - min_score == 0:
-            return np.ones_like(scores)
+        if score_range == 0:
+            return 0.0, 1.0
         
-        return (scores - min_score) / (max_score - min_score)
+        return 1.0 / score_range, -min_score / score_range
     
     def get_stats(self) -> Dict[str, Any]:
         """Get retriever statistics"""
@@ -134,29 +405,243 @@ class HybridRetriever:
             "unique_sources": len(set(c.source for c in self.chunks))
         }
     
-    def index_documents(self, chunks: List[DocumentChunk], append: bool = False):
+    def save_index(self, index_dir: str, fingerprint: str):
+        """
+        Persist chunks, BM25 state and embeddings to index_dir
+        
+        The fingerprint identifies the source documents the index was built from.
+        """
+        self.write_index(index_dir, fingerprint, self.index_snapshot())
+        self.map_saved_embeddings(index_dir)
+    
+    def index_snapshot(self) -> Dict[str, Any]:
+        """
+        Capture the index state for write_index
+        
+        index_documents replaces chunks, BM25 and the matrices rather than
+        mutating them, so references are enough; the HNSW graph grows in
+        place on append and is serialized to memory. Call while indexing is
+        excluded (RAGPipeline holds its index lock).
+        """
+        return {
+            "chunks": self.chunks,
+            "bm25": self.bm25,
+            "embeddings": self.chunk_embeddings,
+            "embeddings_q8": self.chunk_embeddings_q8,
+            "ann": faiss.serialize_index(self._ann) if self._ann is not None else None
+        }
+    
+    @staticmethod
+    def write_index(index_dir: str, fingerprint: str, snapshot: Dict[str, Any]):
+        """Write an index_snapshot to index_dir (needs no lock: the retriever is not touched)"""
+        index_path = Path(index_dir)
+        index_path.mkdir(parents=True, exist_ok=True)
+        
+        # Written to temp files and swapped in: the current matrices may be
+        # memory-mapped from these files, which must not be truncated
+        for name, matrix in (
+            ("embeddings.npy", snapshot["embeddings"]),
+            ("embeddings_q8.npy", snapshot["embeddings_q8"])
+        ):
+            tmp_matrix = index_path / f"{name}.tmp"
+            with open(tmp_matrix, "wb") as f:
+                np.save(f, matrix)
+            os.replace(tmp_matrix, index_path / name)
+        
+        # Metadata is written last (atomically) so a partial save is never loaded
+        tmp_path = index_path / "meta.pkl.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(
+                {
+                    "version": INDEX_FORMAT_VERSION,
+                    "fingerprint": fingerprint,
+                    "chunks": snapshot["chunks"],
+                    "bm25": snapshot["bm25"]
+                },
+                f,
+                protocol=pickle.HIGHEST_PROTOCOL
+            )
+        os.replace(tmp_path, index_path / "meta.pkl")
+        
+        ann_path = index_path / "ann.faiss"
+        if snapshot["ann"] is not None:
+            snapshot["ann"].tofile(index_path / "ann.faiss.tmp")
+            os.replace(index_path / "ann.faiss.tmp", ann_path)
+        elif ann_path.exists():
+            ann_path.unlink()
+        
+        print(f"   Saved index ({len(snapshot['chunks'])} chunks) to {index_dir}")
+    
+    def map_saved_embeddings(self, index_dir: str):
+        """
+        Continue from the matrices written by write_index (same contents) so
+        they leave process memory
+        
+        Only valid while the index is unchanged since the snapshot was taken.
+        """
+        self.chunk_embeddings, self.chunk_embeddings_q8 = self._map_embeddings(Path(index_dir))
+    
+    def load_index(self, index_dir: str, fingerprint: Optional[str] = None) -> bool:
+        """
+        Load a persisted index (embedding matrices are memory-mapped, not copied)
+        
+        Returns False (leaving the retriever untouched) if no index exists or
+        its fingerprint does not match.
+        """
+        index_path = Path(index_dir)
+        meta_path = index_path / "meta.pkl"
+        
+        if not meta_path.exists():
+            return False
+        
+        try:
+            with open(meta_path, "rb") as f:
+                meta = pickle.load(f)
+            
+            if meta.get("version") != INDEX_FORMAT_VERSION:
+                return False
+            
+            if fingerprint is not None and meta["fingerprint"] != fingerprint:
+                return False
+            
+            embeddings, embeddings_q8 = self._map_embeddings(index_path)
+        except Exception as e:
+            print(f"   Could not load index from {index_dir}: {e}")
+            return False
+        
+        num_chunks = len(meta["chunks"])
+        if not len(embeddings) == len(embeddings_q8) == meta["bm25"].scores["num_docs"] == num_chunks:
+            return False
+        
+        self.chunks = meta["chunks"]
+        self.bm25 = meta["bm25"]
+        self._set_embeddings(embeddings, embeddings_q8)
+        
+        # Reuse the persisted HNSW graph when it matches, otherwise rebuild it
+        ann_path = index_path / "ann.faiss"
+        if faiss is not None and ann_path.exists():
+            try:
+                ann = faiss.read_index(str(ann_path))
+                if ann.ntotal == len(self.chunks):
+                    self._ann = ann
+            except RuntimeError as e:
+                print(f"   Could not load HNSW index: {e}")
+        self._ann_index()
+        
+        print(f"   Loaded index ({len(self.chunks)} chunks) from {index_dir}")
+        return True
+    
+    @staticmethod
+    def _map_embeddings(index_path: Path) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Memory-map the persisted float16 and int8 matrices (read-only)
+        
+        Scoring streams the int8 rows from the page cache, so they are not
+        held in process memory.
+        """
+        return (
+            np.load(index_path / "embeddings.npy", mmap_mode="r"),
+            np.load(index_path / "embeddings_q8.npy", mmap_mode="r")
+        )
+    
+    def embed_texts(self, texts: List[str], batch_size: Optional[int] = None) -> np.ndarray:
+        """
+        Embed texts in a single encode call
+        
+        Uses embed_batch_size by default; halves the batch size and retries
+        if the encoder runs out of memory.
+        """
+        batch_size = batch_size or self.embed_batch_size
+        while True:
+            try:
+                return self.embedding_model.encode(
+                    texts,
+                    batch_size=batch_size,
+                    show_progress_bar=False,
+                    convert_to_numpy=True
+                )
+            except (MemoryError, RuntimeError) as e:
+                if batch_size == 1 or (isinstance(e, RuntimeError) and "out of memory" not in str(e)):
+                    raise
+                batch_size //= 2
+                print(f"   Out of memory while embedding, retrying with batch_size={batch_size}")
+    
+    def index_documents(
+        self,
+        chunks: List[DocumentChunk],
+        append: bool = False,
+        embeddings: Optional[np.ndarray] = None,
+        remove_sources: Optional[set] = None
+    ):
+        """
+        Index chunks for BM25 and dense retrieval
+        
+        The new index is built aside and swapped in at the end, so a failure
+        part-way leaves the previous index intact.
+        
+        Args:
+            chunks: Chunks to index
+            append: Add to the existing index instead of replacing it
+            embeddings: Precomputed embeddings aligned with chunks (computed if omitted)
+            remove_sources: Source documents whose chunks are dropped first (when appending)
+        """
         if not chunks:
             print("No chunks to index")
             return
         
+        base_chunks: List[DocumentChunk] = []
+        base_embeddings = base_embeddings_q8 = ann = None
         if append and self.chunks:
-            existing_ids = {(c.source, c.chunk_id) for c in self.chunks}
-            new_chunks = [c for c in chunks if (c.source, c.chunk_id) not in existing_ids]
-            self.chunks = self.chunks + new_chunks
-        else:
-            self.chunks = chunks
+            base_chunks = self.chunks
+            base_embeddings, base_embeddings_q8 = self.chunk_embeddings, self.chunk_embeddings_q8
+            ann = self._ann
+            if remove_sources:
+                keep = [i for i, c in enumerate(base_chunks) if c.source not in remove_sources]
+                if len(keep) < len(base_chunks):
+                    # The HNSW graph cannot drop rows: it is rebuilt from scratch
+                    base_chunks = [base_chunks[i] for i in keep]
+                    base_embeddings, base_embeddings_q8 = base_embeddings[keep], base_embeddings_q8[keep]
+                    ann = None
         
-        texts = [chunk.text for chunk in self.chunks]
+        existing_ids = {(c.source, c.chunk_id) for c in base_chunks}
+        new_rows = [i for i, c in enumerate(chunks) if (c.source, c.chunk_id) not in existing_ids]
+        new_chunks = [chunks[i] for i in new_rows]
+        all_chunks = base_chunks + new_chunks
         
-        print(f"\nIndexing {len(self.chunks)} document chunks...")
+        print(f"\nIndexing {len(all_chunks)} document chunks...")
         print("   Creating BM25 index...")
 
-        tokenized_corpus = [text.split() for text in texts]
-        self.bm25 = BM25Okapi(tokenized_corpus)
+        tokenized_corpus = _tokenize_chunks(all_chunks)
+        bm25 = bm25s.BM25()
+        bm25.index(tokenized_corpus, show_progress=False)
 
         print("   Generating embeddings...")
 
-        self.chunk_embeddings = self.embedding_model.encode(texts, show_progress_bar=True, convert_to_numpy=True)
-
+        if embeddings is not None:
+            new_embeddings = _normalize_rows(np.asarray(embeddings)[new_rows])
+        elif new_chunks:
+            new_embeddings = _normalize_rows(self.embed_texts([c.text for c in new_chunks]))
+        else:
+            new_embeddings = base_embeddings[:0]
+        
+        # Existing int8 rows are kept as-is rather than re-quantized from float16
+        new_embeddings_q8 = _quantize_rows(new_embeddings)
+        if base_chunks:
+            all_embeddings = np.vstack([base_embeddings, new_embeddings.astype(np.float16)])
+            all_embeddings_q8 = np.vstack([base_embeddings_q8, new_embeddings_q8])
+        else:
+            all_embeddings, all_embeddings_q8 = new_embeddings, new_embeddings_q8
+        
+        self._set_embeddings(all_embeddings, all_embeddings_q8)
+        self.chunks = all_chunks
+        self.bm25 = bm25
+        
+        # The HNSW graph only grows on append: insert the new rows rather
+        # than rebuilding it
+        if ann is not None and ann.ntotal == len(base_chunks):
+            self._ann_add(ann, new_embeddings)
+            self._ann = ann
+        self._ann_index()
+        
         print(f"   Indexed {len(self.chunks)} chunks")
         print(f"   Embedding dimensions: {self.chunk_embeddings.shape[1]}")
\ No newline at end of file
@@ -1,8 +1,44 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, FrozenSet, Tuple
 from dataclasses import dataclass
+from functools import lru_cache
 from enum import Enum
 import re
 
+# Currency and percentages come first so each number is matched once, with its unit
+_NUM_RE = re.compile(r'\$\d+(?:,\d{3})*(?:\.\d{2})?|\d+\.?\d*%|\d+\.?\d*')
+# Cheap pre-check: most answers have no digits and skip number extraction entirely
+_DIGIT_RE = re.compile(r'\d')
+# Specific claims: percentages, dollar amounts, dates like "March 3, 2024"
+_SPEC_RE = re.compile(r'\d+\.?\d*%|\$\d+|[A-Z][a-z]+ \d{1,2}, \d{4}')
+
+def _canonical_number(number: str) -> Tuple[str, float]:
+    """
+    (unit, value) form of an extracted number, so "$1,000" matches "$1000.00"
+    
+    The unit ("%", "$" or "") is kept: 5% and $5 are different figures.
+    """
+    unit = "%" if number.endswith("%") else "$" if number.startswith("$") else ""
+    return unit, round(float(number.strip("$%").replace(",", "")), 4)
+
+@lru_cache(maxsize=4096)
+def _chunk_numbers(text: str) -> FrozenSet[Tuple[str, float]]:
+    """
+    Canonical numbers in one source chunk
+    
+    A number with a unit is also added without it, so an answer that states
+    the bare figure ("5 percent" for "5%") still matches; an answer that
+    states a different unit does not. The same chunks are retrieved again
+    and again across queries, so extraction is memoized per chunk instead
+    of rescanning the joined context.
+    """
+    numbers = set()
+    for number in _NUM_RE.findall(text):
+        unit, value = _canonical_number(number)
+        numbers.add((unit, value))
+        if unit:
+            numbers.add(("", value))
+    return frozenset(numbers)
+
 class ValidationLevel(Enum):
     """Validation result levels"""
     HIGH = "high"
@@ -72,6 +108,12 @@ class MultiStageValidator:
         warnings = []
         details = {}
         
+        # Shared by the checks below, so the context is joined and lowercased once
+        source_text = " ".join(chunk.get("text", "") for chunk in retrieved_chunks)
+        answer_lower = answer.lower()
+        answer_tokens = set(answer_lower.split())
+        source_tokens = set(source_text.lower().split())
+        
         retrieval_score = self._check_retrieval_quality(retrieved_chunks)
         details["retrieval_score"] = retrieval_score
         
@@ -81,7 +123,7 @@ class MultiStageValidator:
             failed_checks.append("retrieval_quality")
             warnings.append(f"Low retrieval quality (score: {retrieval_score:.2f})")
         
-        alignment_score = self._check_source_alignment(answer, retrieved_chunks)
+        alignment_score = self._check_source_alignment(answer_tokens, source_tokens)
         details["alignment_score"] = alignment_score
         
         if alignment_score >= self.alignment_threshold:
@@ -90,7 +132,7 @@ class MultiStageValidator:
             failed_checks.append("source_alignment")
             warnings.append("Answer may not be well-supported by sources")
         
-        hallucination_check = self._detect_hallucination(answer, retrieved_chunks)
+        hallucination_check = self._detect_hallucination(answer, answer_lower, retrieved_chunks)
         details["hallucination_indicators"] = hallucination_check
         
         if not hallucination_check["likely_hallucination"]:
@@ -151,26 +193,15 @@ class MultiStageValidator:
     
     def _check_source_alignment(
         self,
-        answer: str,
-        retrieved_chunks: List[Dict[str, Any]]
+        answer_tokens: set,
+        source_tokens: set
     ) -> float:
         """
         Stage 2: Check if answer aligns with retrieved sources
         
-        Uses token overlap as a proxy for alignment
+        Uses token overlap (of lowercased whitespace tokens) as a proxy for alignment
         """
-        if not retrieved_chunks or not answer:
-            return 0.0
-        
-        answer_tokens = set(answer.lower().split())
-        
-        source_text = " ".join([
-            chunk.get("text", "") 
-            for chunk in retrieved_chunks
-        ])
-        source_tokens = set(source_text.lower().split())
-        
-        if not answer_tokens:
+        if not answer_tokens or not source_tokens:
             return 0.0
         
         overlap = answer_tokens.intersection(source_tokens)
@@ -181,6 +212,7 @@ class MultiStageValidator:
     def _detect_hallucination(
         self,
         answer: str,
+        answer_lower: str,
         retrieved_chunks: List[Dict[str, Any]]
     ) -> Dict[str, Any]:
         """
@@ -191,12 +223,12 @@ class MultiStageValidator:
         indicators = []
         likely_hallucination = False
         
-        if "cannot find" in answer.lower() or "not available" in answer.lower():
+        if "cannot find" in answer_lower or "not available" in answer_lower:
             if len(answer.split()) > 20:
                 indicators.append("Contradictory: Claims no info but provides detail")
                 likely_hallucination = True
         
-        has_specifics = bool(re.search(r'\d+\.?\d*%|\$\d+|[A-Z][a-z]+ \d{1,2}, \d{4}', answer))
+        has_specifics = _SPEC_RE.search(answer) is not None
         has_citations = "Source" in answer or "According to" in answer
         
         if has_specifics and not has_citations and len(retrieved_chunks) > 0:
@@ -226,7 +258,7 @@ class MultiStageValidator:
         
         Critical for financial documents - numbers must be exact
         """
-        answer_numbers = self._extract_numbers(answer)
+        answer_numbers = self._extract_numbers(answer) if _DIGIT_RE.search(answer) else []
         
         if not answer_numbers:
             return {
@@ -234,31 +266,21 @@ class MultiStageValidator:
                 "validated": True
             }
         
-        source_text = " ".join([c.get("text", "") for c in retrieved_chunks])
-        source_numbers = self._extract_numbers(source_text)
-        validated = all(num in source_numbers for num in answer_numbers)
+        # Chunks are joined with spaces, so no number spans two chunks
+        source_numbers = set().union(*(_chunk_numbers(c.get("text", "")) for c in retrieved_chunks))
+        matched_count = sum(1 for num in answer_numbers if _canonical_number(num) in source_numbers)
         
         return {
             "has_numbers": True,
-            "validated": validated,
+            "validated": matched_count == len(answer_numbers),
             "answer_numbers": answer_numbers,
-            "matched_count": sum(1 for num in answer_numbers if num in source_numbers),
+            "matched_count": matched_count,
             "total_count": len(answer_numbers)
         }
     
     def _extract_numbers(self, text: str) -> List[str]:
-        """Extract numerical values from text"""
-        patterns = [
-            r'\d+\.?\d*%',
-            r'\$\d+(?:,\d{3})*(?:\.\d{2})?',
-            r'\d+\.?\d*'
-        ]
-        
-        numbers = []
-        for pattern in patterns:
-            numbers.extend(re.findall(pattern, text))
-        
-        return numbers
+        """Extract numerical values ($ amounts, percentages, plain numbers) in one pass"""
+        return _NUM_RE.findall(text)
     
     def _calculate_confidence(
         self,